@@ -1,10 +1,38 @@
 """PDF document cache and path utilities."""
 
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from collections.abc import Iterator
 from pathlib import Path
 
 import fitz  # PyMuPDF
 
-_doc_cache: dict[str, fitz.Document] = {}
+from .parallel import iter_page_texts
+from .toc import get_toc, index_titles
+
+# Resolved path -> {"path": str, "doc": fitz.Document, "mtime_ns": int,
+# "size": int, "toc": list | None, "title_index": dict | None, "has_text": bool | None},
+# least recently used first. "toc", "title_index" and "has_text" stay None
+# until get_doc_info() fills them in.
+_doc_cache: OrderedDict[str, dict] = OrderedDict()
+# Open documents kept at once; evicted ones are closed and their doc info
+# comes back from the on-disk cache if they are used again.
+_DOC_CACHE_SIZE = 8
+
+# (resolved path, mtime_ns, size, page index) -> page text, least recently
+# used first. Keyed on the same stat as the document cache, so an edited
+# file never reads stale text.
+_page_text_cache: OrderedDict[tuple[str, int, int, int], str] = OrderedDict()
+_PAGE_TEXT_CACHE_SIZE = 2048
+
+# Per-user directory for data that should survive server restarts.
+CACHE_DIR = Path.home() / ".cache" / "pdf-reader-mcp"
+
+# Bump whenever the shape of the pickled doc info, or how it is derived,
+# changes.
+_INFO_VERSION = 5
 
 
 def resolve_path(file_path: str) -> str:
@@ -17,19 +45,153 @@ def resolve_path(file_path: str) -> str:
     return str(p)
 
 
+def get_doc_entry(file_path: str) -> dict:
+    """Return the ``_doc_cache`` entry for a PDF, opening it on first use.
+
+    A file modified since it was opened is reopened, which also drops the
+    memoised doc info.  Only the ``_DOC_CACHE_SIZE`` most recently used
+    documents stay open.  Tools fetch the entry once per call and pass it
+    on, so the path is resolved and its mtime and size read once per call;
+    everything keyed on them uses the values recorded on the entry.
+    """
+    key = resolve_path(file_path)
+    st = os.stat(key)
+    entry = _doc_cache.get(key)
+    if entry is not None and (entry["mtime_ns"], entry["size"]) != (st.st_mtime_ns, st.st_size):
+        entry["doc"].close()
+        entry = None
+    if entry is None:
+        entry = {"path": key, "doc": fitz.open(key), "mtime_ns": st.st_mtime_ns,
+                 "size": st.st_size, "toc": None, "title_index": None, "has_text": None}
+        _doc_cache[key] = entry
+        if len(_doc_cache) > _DOC_CACHE_SIZE:
+            _, evicted = _doc_cache.popitem(last=False)
+            evicted["doc"].close()
+    _doc_cache.move_to_end(key)
+    return entry
+
+
 def open_doc(file_path: str) -> fitz.Document:
     """Open a PDF, returning a cached document if available."""
-    key = resolve_path(file_path)
-    if key in _doc_cache:
-        return _doc_cache[key]
-    doc = fitz.open(key)
-    _doc_cache[key] = doc
-    return doc
+    return get_doc_entry(file_path)["doc"]
 
 
 def check_has_text(doc: fitz.Document, sample_pages: int = 5) -> bool:
-    """Check if the PDF contains extractable text."""
+    """Check if the PDF contains extractable text.
+
+    Counts characters after trimming each page's edges, so blank lines
+    around a lone page number do not pass for text.  Stops at the first of
+    ``sample_pages`` pages that brings the running total to 50 characters,
+    which is usually page 1.
+    """
     total_chars = 0
     for i in range(min(sample_pages, len(doc))):
         total_chars += len(doc[i].get_text().strip())
-    return total_chars >= 50
+        if total_chars >= 50:
+            return True
+    return False
+
+
+def _info_cache_file(entry: dict) -> Path:
+    """Return the on-disk info cache file for a ``_doc_cache`` entry.
+
+    The name hashes path, mtime and size as recorded when the document was
+    opened, so an edited PDF never hits a stale entry and the info always
+    describes the document actually held open.
+    """
+    digest = hashlib.sha1(
+        f"{_INFO_VERSION}:{entry['path']}:{entry['mtime_ns']}:{entry['size']}".encode()
+    ).hexdigest()
+    return CACHE_DIR / f"{digest}.pkl"
+
+
+def get_doc_info(file_path: str) -> dict:
+    """Return the cache entry for a PDF with its doc info filled in.
+
+    ``toc`` and ``has_text`` are memoised on the entry and pickled under
+    ``CACHE_DIR``, so later calls -- including ones from a restarted server
+    process -- skip heading detection and text sampling entirely.  The
+    exact-title ``title_index`` is rebuilt from the TOC in memory.
+    """
+    entry = get_doc_entry(file_path)
+    if entry["toc"] is not None:
+        return entry
+
+    cache_file = _info_cache_file(entry)
+    info = None
+    try:
+        info = pickle.loads(cache_file.read_bytes())
+    except Exception:
+        pass  # missing or unreadable entry: recompute below
+
+    if info is None:
+        doc = entry["doc"]
+        info = {"toc": get_toc(doc), "has_text": check_has_text(doc)}
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache_file.write_bytes(pickle.dumps(info, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError:
+            pass  # caching is best-effort
+
+    entry.update(info)
+    entry["title_index"] = index_titles(info["toc"])
+    return entry
+
+
+def _remember_page_text(cache_key: tuple[str, int, int, int], text: str) -> None:
+    """Store a page's text in ``_page_text_cache``, evicting the oldest entry."""
+    _page_text_cache[cache_key] = text
+    _page_text_cache.move_to_end(cache_key)
+    if len(_page_text_cache) > _PAGE_TEXT_CACHE_SIZE:
+        _page_text_cache.popitem(last=False)
+
+
+def get_page_texts(entry: dict, start: int, stop: int) -> list[str]:
+    """Return the text of pages ``start`` to ``stop - 1`` (0-based), cached.
+
+    ``entry`` comes from ``get_doc_entry`` or ``get_doc_info``.
+    """
+    key = entry["path"]
+    doc = entry["doc"]
+    mtime_ns = entry["mtime_ns"]
+    size = entry["size"]
+    texts = []
+    for i in range(start, stop):
+        cache_key = (key, mtime_ns, size, i)
+        text = _page_text_cache.get(cache_key)
+        if text is None:
+            text = doc[i].get_text()
+            _remember_page_text(cache_key, text)
+        else:
+            _page_text_cache.move_to_end(cache_key)
+        texts.append(text)
+    return texts
+
+
+def iter_doc_texts(entry: dict) -> Iterator[str]:
+    """Yield the text of every page of a cached PDF, in page order.
+
+    Served from the page-text cache when every page is in it; otherwise
+    the whole document is extracted (in parallel if large) and cached.
+    Documents longer than the cache are extracted without caching: they
+    could never be served whole from it, and would only evict every
+    other document's pages.
+    """
+    doc = entry["doc"]
+    if len(doc) > _PAGE_TEXT_CACHE_SIZE:
+        yield from iter_page_texts(doc)
+        return
+
+    key = entry["path"]
+    mtime_ns = entry["mtime_ns"]
+    size = entry["size"]
+    cache_keys = [(key, mtime_ns, size, i) for i in range(len(doc))]
+    if all(k in _page_text_cache for k in cache_keys):
+        for k in cache_keys:
+            _page_text_cache.move_to_end(k)
+            yield _page_text_cache[k]
+        return
+
+    for cache_key, text in zip(cache_keys, iter_page_texts(doc)):
+        _remember_page_text(cache_key, text)
+        yield text
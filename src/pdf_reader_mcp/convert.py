@@ -1,9 +1,13 @@
 """Markdown-to-PDF conversion with KaTeX math rendering."""
 
+import functools
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from .app import mcp
+from .cache import CACHE_DIR
 
 # ---------------------------------------------------------------------------
 # Math-safe Markdown → HTML helpers
@@ -19,31 +23,49 @@ def _extract_math(text: str) -> tuple[str, list[tuple[str, bool]]]:
     Returns the modified text and a list of (expression, is_display) tuples.
     """
     expressions: list[tuple[str, bool]] = []
-
-    def _replacer(m: re.Match) -> str:
-        display = m.group(1)
-        inline = m.group(2)
-        expr = display if display is not None else inline
-        idx = len(expressions)
-        expressions.append((expr, display is not None))
-        return f"MATHPH{idx}ENDMATH"
-
-    return _MATH_RE.sub(_replacer, text), expressions
+    out: list[str] = []
+    last = 0
+    for m in _MATH_RE.finditer(text):
+        display, inline = m.groups()
+        is_display = display is not None
+        out.append(text[last:m.start()])
+        out.append(f"MATHPH{len(expressions)}ENDMATH")
+        expressions.append((display if is_display else inline, is_display))
+        last = m.end()
+    out.append(text[last:])
+    return "".join(out), expressions
 
 
 def _restore_math_delimiters(
     html: str, expressions: list[tuple[str, bool]],
 ) -> str:
     """Replace MATHPH...ENDMATH placeholders back to $...$ / $$...$$ delimiters."""
-
-    def _replacer(m: re.Match) -> str:
+    out: list[str] = []
+    last = 0
+    for m in _PLACEHOLDER_RE.finditer(html):
         idx = int(m.group(1))
         if idx >= len(expressions):
-            return m.group(0)
+            continue  # not one of ours: left in place with the next slice
         expr, is_display = expressions[idx]
-        return f"$${expr}$$" if is_display else f"${expr}$"
+        out.append(html[last:m.start()])
+        out.append(f"$${expr}$$" if is_display else f"${expr}$")
+        last = m.end()
+    out.append(html[last:])
+    return "".join(out)
+
 
-    return _PLACEHOLDER_RE.sub(_replacer, html)
+@functools.cache
+def _markdown_renderer():
+    """CommonMark parser with GFM tables (fenced code is built in).
+
+    CommonMark is stricter than the Python-Markdown it replaced: a list may
+    follow a paragraph line directly, nested lists need only two spaces,
+    and ordered lists keep their start number and accept ``1)`` markers.
+    Summaries written for the old renderer can therefore lay out differently.
+    """
+    from markdown_it import MarkdownIt
+
+    return MarkdownIt("commonmark").enable("table")
 
 
 # ---------------------------------------------------------------------------
@@ -51,6 +73,8 @@ def _restore_math_delimiters(
 # ---------------------------------------------------------------------------
 
 _KATEX_VERSION = "0.16.21"
+_KATEX_URL_PREFIX = f"https://cdn.jsdelivr.net/npm/katex@{_KATEX_VERSION}/dist/"
+_KATEX_ASSET_DIR = CACHE_DIR / f"katex-{_KATEX_VERSION}"
 
 _PAGE_CSS = """\
 body {
@@ -131,29 +155,131 @@ em { font-size: 0.9em; color: #555; }
 """
 
 
+# Everything around the body is fixed, so it is rendered once at import.
+_HTML_HEAD = (
+    '<!DOCTYPE html>\n'
+    '<html><head><meta charset="utf-8">\n'
+    f'<link rel="stylesheet" href="{_KATEX_URL_PREFIX}katex.min.css">\n'
+    f'<script src="{_KATEX_URL_PREFIX}katex.min.js"></script>\n'
+    f'<script src="{_KATEX_URL_PREFIX}contrib/auto-render.min.js"></script>\n'
+    f'<style>{_PAGE_CSS}</style>\n'
+    '</head><body>\n'
+)
+_HTML_TAIL = (
+    '\n'
+    '<script>'
+    'renderMathInElement(document.body, {'
+    '  delimiters: ['
+    '    {left: "$$", right: "$$", display: true},'
+    '    {left: "$", right: "$", display: false}'
+    '  ],'
+    '  throwOnError: false'
+    '});'
+    '</script>\n'
+    '</body></html>'
+)
+
+
 def _build_katex_html(body_html: str) -> str:
     """Wrap an HTML body fragment in a full document with KaTeX auto-render."""
-    v = _KATEX_VERSION
-    return (
-        '<!DOCTYPE html>\n'
-        '<html><head><meta charset="utf-8">\n'
-        f'<link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/katex@{v}/dist/katex.min.css">\n'
-        f'<script src="https://cdn.jsdelivr.net/npm/katex@{v}/dist/katex.min.js"></script>\n'
-        f'<script src="https://cdn.jsdelivr.net/npm/katex@{v}/dist/contrib/auto-render.min.js"></script>\n'
-        f'<style>{_PAGE_CSS}</style>\n'
-        '</head><body>\n'
-        f'{body_html}\n'
-        '<script>'
-        'renderMathInElement(document.body, {'
-        '  delimiters: ['
-        '    {left: "$$", right: "$$", display: true},'
-        '    {left: "$", right: "$", display: false}'
-        '  ],'
-        '  throwOnError: false'
-        '});'
-        '</script>\n'
-        '</body></html>'
-    )
+    return _HTML_HEAD + body_html + _HTML_TAIL
+
+
+def _serve_katex_asset(route) -> None:
+    """Playwright route handler answering KaTeX requests from a local copy.
+
+    The first request for each file (CSS, JS, fonts) goes to the CDN and
+    the body is saved under ``_KATEX_ASSET_DIR``; after that, conversions
+    never wait on the network and work offline.
+    """
+    rel = route.request.url[len(_KATEX_URL_PREFIX):].split("?", 1)[0]
+    if not rel or ".." in Path(rel).parts:
+        route.continue_()
+        return
+    local = _KATEX_ASSET_DIR / rel
+    if local.is_file():
+        route.fulfill(path=local)
+        return
+
+    try:
+        response = route.fetch()
+    except Exception:
+        route.abort()
+        return
+    body = response.body()
+    if response.ok:
+        # Write beside the target and rename over it, so another server
+        # process never serves a half-written asset from the cache.
+        tmp_file = local.parent / f".{local.name}.{os.getpid()}.tmp"
+        try:
+            local.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                tmp_file.write_bytes(body)
+                os.replace(tmp_file, local)
+            except BaseException:
+                tmp_file.unlink(missing_ok=True)
+                raise
+        except OSError:
+            pass  # caching is best-effort
+    route.fulfill(response=response, body=body)
+
+
+# ---------------------------------------------------------------------------
+# Headless Chromium renderer
+# ---------------------------------------------------------------------------
+
+# Playwright's sync API is bound to the thread that started it, so all
+# rendering runs on one dedicated thread that keeps Chromium warm between
+# conversions.  The Playwright driver closes the browser when the server
+# process exits.
+_render_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-render")
+_playwright = None
+_browser = None
+
+
+def _get_browser():
+    """Return the shared Chromium instance, (re)launching it when needed.
+
+    Must only be called on ``_render_thread``.
+    """
+    global _playwright, _browser
+    if _browser is None or not _browser.is_connected():
+        if _playwright is None:
+            from playwright.sync_api import sync_playwright
+
+            _playwright = sync_playwright().start()
+        _browser = _playwright.chromium.launch()
+    return _browser
+
+
+def _render_pdf(full_html: str, pdf_path: Path) -> None:
+    """Print ``full_html`` to ``pdf_path`` as an A4 PDF (runs on ``_render_thread``)."""
+    page = _get_browser().new_page()
+    try:
+        page.route(f"{_KATEX_URL_PREFIX}**", _serve_katex_asset)
+        # KaTeX renders synchronously before "load"; then wait for the
+        # math fonts instead of a fixed networkidle quiet period.
+        page.set_content(full_html, wait_until="load")
+        page.evaluate("document.fonts.ready.then(() => true)")
+        page.pdf(
+            path=str(pdf_path),
+            format="A4",
+            margin={
+                "top": "0.6in",
+                "bottom": "0.7in",
+                "left": "0.5in",
+                "right": "0.5in",
+            },
+            display_header_footer=True,
+            header_template="<span></span>",
+            footer_template=(
+                '<div style="font-family: Georgia, serif; font-size: 9pt;'
+                ' text-align: center; width: 100%;">'
+                '<span class="pageNumber"></span></div>'
+            ),
+        )
+    finally:
+        page.close()
 
 
 # ---------------------------------------------------------------------------
@@ -172,8 +298,6 @@ def convert_md_to_pdf(md_file_path: str) -> str:
     Args:
         md_file_path: Path to the Markdown (.md) file to convert.
     """
-    import markdown
-
     p = Path(md_file_path).resolve()
     if not p.exists():
         return f"ERROR: File not found: {p}"
@@ -183,37 +307,14 @@ def convert_md_to_pdf(md_file_path: str) -> str:
     md_text = p.read_text(encoding="utf-8")
 
     md_text, math_exprs = _extract_math(md_text)
-    html_body = markdown.markdown(md_text, extensions=["tables", "fenced_code"])
+    html_body = _markdown_renderer().render(md_text)
     html_body = _restore_math_delimiters(html_body, math_exprs)
     full_html = _build_katex_html(html_body)
 
     pdf_path = p.with_suffix(".pdf")
 
     try:
-        from playwright.sync_api import sync_playwright
-
-        with sync_playwright() as pw:
-            browser = pw.chromium.launch()
-            page = browser.new_page()
-            page.set_content(full_html, wait_until="networkidle")
-            page.pdf(
-                path=str(pdf_path),
-                format="A4",
-                margin={
-                    "top": "0.6in",
-                    "bottom": "0.7in",
-                    "left": "0.5in",
-                    "right": "0.5in",
-                },
-                display_header_footer=True,
-                header_template="<span></span>",
-                footer_template=(
-                    '<div style="font-family: Georgia, serif; font-size: 9pt;'
-                    ' text-align: center; width: 100%;">'
-                    '<span class="pageNumber"></span></div>'
-                ),
-            )
-            browser.close()
+        _render_thread.submit(_render_pdf, full_html, pdf_path).result()
     except Exception as e:
         return f"ERROR: Failed to render PDF: {e}"
 
@@ -1,147 +1,255 @@
 """Table-of-contents extraction and section-page lookup."""
 
 import re
-from statistics import median
+from collections import Counter
 
 import fitz  # PyMuPDF
 
+from .parallel import iter_page_ranges
 
-def detect_headings(doc: fitz.Document) -> list[dict]:
-    """Heuristically detect section headings by analysing font sizes.
+# Deletes every character ``\s`` matches (i.e. every ``str.isspace`` char).
+_WS_TABLE = str.maketrans("", "", (
+    "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680"
+    "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
+    "\u2028\u2029\u202f\u205f\u3000"
+))
 
-    Returns a list of ``{"title": str, "page": int (1-based), "level": int}``.
+# Images are left out of the "dict" output (no TEXT_PRESERVE_IMAGES), and
+# glyphs outside the mediabox are dropped, as plain get_text() does.
+_SCAN_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+# Span "flags" bit PyMuPDF sets for bold fonts.
+_BOLD_BIT = 1 << 4
+
+_UPPERCASE_HEADING_RE = re.compile(r"^[A-Z][A-Z\s:&-]{4,}$")
+
+
+def _is_numbered_heading(text: str) -> bool:
+    r"""Same result as ``re.match(r"^(\d+\.?\d*\.?\d*)\s+[A-Z]", text)``.
+
+    That pattern accepts a run of digits and at most two dots that starts
+    with a digit, then whitespace, then an ASCII capital.  Scanning for it
+    directly avoids the regex backtracking through every way of splitting
+    a plain number such as "2019 results" before failing.
     """
-    font_sizes: list[float] = []
-    spans_info: list[dict] = []
+    n = len(text)
+    if not n or not text[0].isdecimal():
+        return False
+    dots = 0
+    i = 1
+    while i < n:
+        c = text[i]
+        if c == ".":
+            dots += 1
+            if dots > 2:
+                return False
+        elif not c.isdecimal():
+            break
+        i += 1
+    j = i
+    while j < n and text[j].isspace():
+        j += 1
+    return i < j < n and "A" <= text[j] <= "Z"
+
 
-    for page_idx in range(len(doc)):
-        page = doc[page_idx]
-        blocks = page.get_text("dict", flags=fitz.TEXT_PRESERVE_WHITESPACE)["blocks"]
+def _median_from_counts(counts: Counter) -> float:
+    """Median of a ``{value: count}`` histogram (same result as ``statistics.median``).
+
+    Walks the distinct values in order, so the cost depends on the number of
+    distinct font sizes (a few dozen) rather than the number of spans.
+    """
+    total = sum(counts.values())
+    lo_rank = (total - 1) // 2
+    hi_rank = total // 2
+    seen = 0
+    lo = 0.0
+    for value in sorted(counts):
+        prev_seen = seen
+        seen += counts[value]
+        if prev_seen <= lo_rank < seen:
+            lo = value
+        if hi_rank < seen:
+            return (lo + value) / 2
+    return lo
+
+
+def _scan_pages(
+    doc: fitz.Document, start: int, stop: int,
+) -> tuple[Counter[float], list[tuple[str, float, bool, int]]]:
+    """Collect font-size counts and heading-length lines for a page range.
+
+    Lines are ``(text, max_size, bold, page_idx)`` tuples.
+    """
+    font_sizes: Counter[float] = Counter()
+    spans_info: list[tuple[str, float, bool, int]] = []
+    add_line = spans_info.append
+
+    for page_idx in range(start, stop):
+        # Sizes are counted per page with one C-level Counter.update().
+        page_sizes: list[float] = []
+        add_size = page_sizes.append
+        blocks = doc[page_idx].get_text("dict", flags=_SCAN_FLAGS)["blocks"]
         for block in blocks:
-            if block.get("type") != 0:
+            if block["type"] != 0:
                 continue
-            for line in block.get("lines", []):
-                line_text = ""
+            for line in block["lines"]:
+                spans = line["spans"]
                 max_size = 0.0
                 is_bold = False
-                for span in line.get("spans", []):
-                    line_text += span.get("text", "")
-                    size = span.get("size", 0)
+                for span in spans:
+                    size = span["size"]
+                    add_size(size)
                     if size > max_size:
                         max_size = size
-                    flags = span.get("flags", 0)
-                    if flags & (1 << 4):  # bold bit
+                    if span["flags"] & _BOLD_BIT:
                         is_bold = True
-                    font_sizes.append(size)
 
-                line_text = line_text.strip()
-                if line_text:
-                    spans_info.append({
-                        "text": line_text,
-                        "size": max_size,
-                        "bold": is_bold,
-                        "page": page_idx,
-                    })
+                # Every span feeds the size statistics, but only lines short
+                # enough to be a heading are kept for classification.
+                line_text = "".join([span["text"] for span in spans]).strip()
+                if 2 <= len(line_text) <= 120:
+                    add_line((line_text, max_size, is_bold, page_idx))
+        font_sizes.update(page_sizes)
+
+    return font_sizes, spans_info
+
+
+def detect_headings(doc: fitz.Document, max_headings: int = 500) -> list[dict]:
+    """Heuristically detect section headings by analysing font sizes.
+
+    Large documents are scanned in parallel worker processes.  At most
+    ``max_headings`` headings are returned.
+    Returns a list of ``{"title": str, "page": int (1-based), "level": int}``.
+    """
+    font_sizes: Counter[float] = Counter()
+    spans_info: list[tuple[str, float, bool, int]] = []
+    for sizes, lines in iter_page_ranges(doc, _scan_pages):
+        font_sizes.update(sizes)
+        spans_info.extend(lines)
 
     if not font_sizes:
         return []
 
-    median_size = median(font_sizes)
+    median_size = _median_from_counts(font_sizes)
     heading_threshold = median_size * 1.25
-
-    numbered_heading_re = re.compile(r"^(\d+\.?\d*\.?\d*)\s+[A-Z]")
-    uppercase_heading_re = re.compile(r"^[A-Z][A-Z\s:&-]{4,}$")
+    level1_threshold = median_size * 1.5
 
     headings: list[dict] = []
-    for info in spans_info:
-        text = info["text"]
-        size = info["size"]
-
-        if len(text) > 120 or len(text) < 2:
+    for text, size, bold, page_idx in spans_info:
+        # Every rule needs at least median size, so the numeric tests run
+        # first and the pattern checks only see lines that survive them.
+        if size < median_size:
             continue
-
-        is_heading = False
-        level = 2
-
         if size >= heading_threshold:
-            is_heading = True
-            level = 1 if size >= median_size * 1.5 else 2
-
-        if not is_heading and info["bold"] and size >= median_size:
-            if numbered_heading_re.match(text) or uppercase_heading_re.match(text):
-                is_heading = True
-                level = 1
-
-        if not is_heading and numbered_heading_re.match(text) and size >= median_size:
-            is_heading = True
+            level = 1 if size >= level1_threshold else 2
+        # Candidate lines are stripped and non-empty; a cheap first-character
+        # test skips the regex for lines that cannot match it.
+        elif _is_numbered_heading(text):
             level = 1
+        elif bold and text[0].isupper() and _UPPERCASE_HEADING_RE.match(text):
+            level = 1
+        else:
+            continue
 
-        if is_heading:
-            headings.append({
-                "title": text,
-                "page": info["page"] + 1,
-                "level": level,
-            })
+        headings.append({
+            "title": text,
+            "page": page_idx + 1,
+            "level": level,
+        })
+        if len(headings) >= max_headings:
+            break
 
     return headings
 
 
+def _index_entry(entry: dict) -> dict:
+    """Add the normalised title forms used by ``find_section_pages``."""
+    title_lower = entry["title"].lower().strip()
+    entry["title_lower"] = title_lower
+    entry["title_nospace"] = title_lower.translate(_WS_TABLE)
+    entry["words"] = frozenset(title_lower.split())
+    return entry
+
+
 def get_toc(doc: fitz.Document) -> list[dict]:
     """Get the table of contents.
 
     Uses the built-in outline first, falls back to heuristic heading
     detection.  Returns ``[{"level": int, "title": str, "page": int}]``
-    with 1-based page numbers.
+    with 1-based page numbers; each entry also carries ``title_lower``,
+    ``title_nospace`` and ``words`` for section matching.
     """
     raw_toc = doc.get_toc(simple=True)
     if raw_toc:
-        return [
+        toc = [
             {"level": entry[0], "title": entry[1].strip(), "page": entry[2]}
             for entry in raw_toc
             if entry[1].strip()
         ]
-    return detect_headings(doc)
+    else:
+        toc = detect_headings(doc)
+    return [_index_entry(entry) for entry in toc]
+
+
+def index_titles(toc: list[dict]) -> dict[str, int]:
+    """Map each entry's ``title_lower`` and ``title_nospace`` to its index.
+
+    The first entry wins when titles repeat.  Both forms share one dict:
+    a key without whitespace means the same thing in either form.
+    """
+    index: dict[str, int] = {}
+    for i, entry in enumerate(toc):
+        index.setdefault(entry["title_lower"], i)
+        index.setdefault(entry["title_nospace"], i)
+    return index
 
 
 def find_section_pages(
     toc: list[dict], section_title: str, total_pages: int,
-) -> tuple[int, int] | None:
+    title_index: dict[str, int],
+) -> tuple[int, int, int] | None:
     """Find the page range for a section (fuzzy match).
 
-    Returns ``(start_page_0based, end_page_0based_exclusive)`` or ``None``.
+    ``toc`` must come from ``get_toc`` (entries carry normalised titles) and
+    ``title_index`` from ``index_titles(toc)``, which resolves exact title
+    matches without scanning the TOC.
+    Returns ``(start_page_0based, end_page_0based_exclusive, toc_index)``
+    or ``None``, where ``toc_index`` is the matched entry.
     """
     query = section_title.lower().strip()
-    query_nospace = re.sub(r"\s+", "", query)
-
-    best_idx = -1
-    best_score = 0.0
-
-    for i, entry in enumerate(toc):
-        title_lower = entry["title"].lower().strip()
-        title_nospace = re.sub(r"\s+", "", title_lower)
-
-        if query == title_lower or query_nospace == title_nospace:
-            best_idx = i
-            break
-
-        if query in title_lower or title_lower in query:
-            score = len(query) / max(len(title_lower), 1)
-            if score > best_score:
-                best_score = score
-                best_idx = i
-            continue
+    query_nospace = query.translate(_WS_TABLE)
+
+    exact = [
+        idx for idx in (title_index.get(query), title_index.get(query_nospace))
+        if idx is not None
+    ]
+    if exact:
+        best_idx = min(exact)
+    else:
+        best_idx = -1
+        best_score = 0.0
+        query_words = frozenset(query.split())
+
+        for i, entry in enumerate(toc):
+            title_lower = entry["title_lower"]
+
+            if query in title_lower or title_lower in query:
+                score = len(query) / max(len(title_lower), 1)
+                if score > best_score:
+                    best_score = score
+                    best_idx = i
+                continue
 
-        query_words = set(query.split())
-        title_words = set(title_lower.split())
-        overlap = query_words & title_words
-        if overlap:
-            score = len(overlap) / max(len(query_words | title_words), 1)
-            if score > best_score:
-                best_score = score
-                best_idx = i
+            title_words = entry["words"]
+            overlap = query_words & title_words
+            if overlap:
+                score = len(overlap) / max(len(query_words | title_words), 1)
+                if score > best_score:
+                    best_score = score
+                    best_idx = i
 
-    if best_idx < 0:
-        return None
+        if best_idx < 0:
+            return None
 
     start_page = toc[best_idx]["page"] - 1
     matched_level = toc[best_idx]["level"]
@@ -152,4 +260,4 @@ def find_section_pages(
             end_page = toc[j]["page"] - 1
             break
 
-    return (start_page, end_page)
+    return (start_page, end_page, best_idx)
@@ -1,12 +1,39 @@
 """MCP tools for PDF reading: info, pages, sections, images, search, and summary saving."""
 
-import base64
-from collections import defaultdict
+import binascii
+import io
+import os
+import re
+from array import array
+from itertools import islice
 from pathlib import Path
 
 from .app import mcp
-from .cache import check_has_text, open_doc, resolve_path
-from .toc import find_section_pages, get_toc
+from .cache import get_doc_entry, get_doc_info, get_page_texts, iter_doc_texts, open_doc
+from .toc import find_section_pages
+
+
+# ---------------------------------------------------------------------------
+# Shared helpers
+# ---------------------------------------------------------------------------
+
+
+def _read_page_range(entry: dict, start: int, stop: int) -> tuple[str, int]:
+    """Format pages ``start`` to ``stop - 1`` (0-based) for a read tool.
+
+    Returns the body -- each page preceded by a blank line and a
+    ``--- Page N ---`` marker -- and the total number of text characters.
+    """
+    buf = io.StringIO()
+    total_chars = 0
+    for i, text in enumerate(get_page_texts(entry, start, stop), start):
+        # strip() trims only the page edges, and hands back ``text`` itself
+        # when there is nothing to trim.
+        text = text.strip()
+        total_chars += len(text)
+        buf.write(f"\n\n--- Page {i + 1} ---\n\n")
+        buf.write(text if text else "(no text on this page)")
+    return buf.getvalue(), total_chars
 
 
 # ---------------------------------------------------------------------------
@@ -26,17 +53,18 @@ def pdf_info(file_path: str) -> str:
         file_path: Absolute or relative path to the PDF file.
     """
     try:
-        doc = open_doc(file_path)
+        info = get_doc_info(file_path)
     except (FileNotFoundError, ValueError) as e:
         return f"ERROR: {e}"
 
+    doc = info["doc"]
     meta = doc.metadata or {}
-    has_text = check_has_text(doc)
-    toc = get_toc(doc)
+    has_text = info["has_text"]
+    toc = info["toc"]
 
     lines = [
         "=== PDF Info ===",
-        f"File: {resolve_path(file_path)}",
+        f"File: {info['path']}",
         f"Pages: {len(doc)}",
         f"Title: {meta.get('title', '') or '(unknown)'}",
         f"Author: {meta.get('author', '') or '(unknown)'}",
@@ -84,11 +112,11 @@ def pdf_read_pages(file_path: str, start_page: int, end_page: int = 0) -> str:
         end_page: Last page to read (1-based, inclusive). 0 means same as start_page.
     """
     try:
-        doc = open_doc(file_path)
+        entry = get_doc_entry(file_path)
     except (FileNotFoundError, ValueError) as e:
         return f"ERROR: {e}"
 
-    total = len(doc)
+    total = len(entry["doc"])
     if end_page <= 0:
         end_page = start_page
 
@@ -104,20 +132,13 @@ def pdf_read_pages(file_path: str, start_page: int, end_page: int = 0) -> str:
         end_page = start_page + 9
         page_count = 10
 
-    parts: list[str] = []
-    total_chars = 0
-    for i in range(start_page - 1, end_page):
-        page = doc[i]
-        text = page.get_text().strip()
-        total_chars += len(text)
-        parts.append(f"--- Page {i + 1} ---")
-        parts.append(text if text else "(no text on this page)")
+    body, total_chars = _read_page_range(entry, start_page - 1, end_page)
 
     header = (
         f"[Pages {start_page}-{end_page} of {total} | "
         f"{page_count} page(s) | {total_chars} chars]"
     )
-    return header + "\n\n" + "\n\n".join(parts)
+    return header + body
 
 
 # ---------------------------------------------------------------------------
@@ -138,18 +159,19 @@ def pdf_read_section(file_path: str, section_title: str) -> str:
         section_title: Title of the section to read (fuzzy matched).
     """
     try:
-        doc = open_doc(file_path)
+        info = get_doc_info(file_path)
     except (FileNotFoundError, ValueError) as e:
         return f"ERROR: {e}"
 
-    toc = get_toc(doc)
+    toc = info["toc"]
     if not toc:
         return (
             "ERROR: No table of contents or section headings detected in this PDF. "
             "Use pdf_read_pages to read by page number instead."
         )
 
-    result = find_section_pages(toc, section_title, len(doc))
+    total = len(info["doc"])
+    result = find_section_pages(toc, section_title, total, info["title_index"])
     if result is None:
         available = ", ".join(f'"{e["title"]}"' for e in toc[:20])
         return (
@@ -157,27 +179,16 @@ def pdf_read_section(file_path: str, section_title: str) -> str:
             f"Available sections: {available}"
         )
 
-    start_0, end_0 = result
-    matched_entry = None
-    for entry in toc:
-        if entry["page"] - 1 == start_0:
-            matched_entry = entry
-            break
+    start_0, end_0, matched_idx = result
 
     page_count = end_0 - start_0
     if page_count > 15:
         end_0 = start_0 + 15
         page_count = 15
 
-    parts: list[str] = []
-    total_chars = 0
-    for i in range(start_0, end_0):
-        text = doc[i].get_text().strip()
-        total_chars += len(text)
-        parts.append(f"--- Page {i + 1} ---")
-        parts.append(text if text else "(no text on this page)")
+    body, total_chars = _read_page_range(info, start_0, end_0)
 
-    matched_title = matched_entry["title"] if matched_entry else section_title
+    matched_title = toc[matched_idx]["title"]
     header = (
         f'[Section: "{matched_title}" | '
         f"Pages {start_0 + 1}-{end_0} | {page_count} page(s) | {total_chars} chars]"
@@ -186,7 +197,7 @@ def pdf_read_section(file_path: str, section_title: str) -> str:
     if page_count == 15:
         header += "\n(Section truncated to 15 pages. Use pdf_read_pages for remaining content.)"
 
-    return header + "\n\n" + "\n\n".join(parts)
+    return header + body
 
 
 # ---------------------------------------------------------------------------
@@ -194,6 +205,18 @@ def pdf_read_section(file_path: str, section_title: str) -> str:
 # ---------------------------------------------------------------------------
 
 
+# extract_image() "ext" -> MIME type; anything else maps to image/<ext>.
+_MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "jpg": "image/jpeg",
+    "jxr": "image/jxr",
+    "jpx": "image/jpx",
+    "bmp": "image/bmp",
+    "tiff": "image/tiff",
+}
+
+
 @mcp.tool()
 def pdf_get_page_images(file_path: str, page_number: int) -> list | str:
     """Extract images from a specific page of the PDF.
@@ -223,18 +246,14 @@ def pdf_get_page_images(file_path: str, page_number: int) -> list | str:
     results = []
     skipped = 0
 
-    mime_map = {
-        "png": "image/png",
-        "jpeg": "image/jpeg",
-        "jpg": "image/jpeg",
-        "jxr": "image/jxr",
-        "jpx": "image/jpx",
-        "bmp": "image/bmp",
-        "tiff": "image/tiff",
-    }
-
     for img_idx, img_info in enumerate(image_list):
-        xref = img_info[0]
+        # (xref, smask, width, height, ...): reject tiny images before
+        # extract_image() pays for decoding their stream.
+        xref, _, width, height = img_info[:4]
+        if width < 50 or height < 50:
+            skipped += 1
+            continue
+
         try:
             base_image = doc.extract_image(xref)
         except Exception:
@@ -245,18 +264,13 @@ def pdf_get_page_images(file_path: str, page_number: int) -> list | str:
             skipped += 1
             continue
 
-        width = base_image.get("width", 0)
-        height = base_image.get("height", 0)
-
-        if width < 50 or height < 50:
-            skipped += 1
-            continue
-
+        width = base_image.get("width", width)
+        height = base_image.get("height", height)
         img_bytes = base_image["image"]
         ext = base_image.get("ext", "png")
-        mime_type = mime_map.get(ext, f"image/{ext}")
+        mime_type = _MIME_TYPES.get(ext, f"image/{ext}")
 
-        b64 = base64.b64encode(img_bytes).decode("ascii")
+        b64 = binascii.b2a_base64(img_bytes, newline=False).decode("ascii")
         results.append({"type": "image", "data": b64, "mimeType": mime_type})
         results.append({
             "type": "text",
@@ -284,6 +298,27 @@ def pdf_get_page_images(file_path: str, page_number: int) -> list | str:
 # ---------------------------------------------------------------------------
 
 
+def _search_pattern(query: str) -> re.Pattern:
+    """Compile a case-insensitive pattern whose group 1 is each occurrence of ``query``.
+
+    Overlapping occurrences must all be counted.  They are only possible
+    when a proper prefix of the query matches its suffix of the same
+    length; otherwise a plain pattern finds the same hits, and it lets the
+    regex engine skip ahead to candidate positions, which a zero-width
+    lookahead prevents.
+    """
+    escaped = re.escape(query)
+    n = len(query)
+    first_char = re.compile(re.escape(query[0]), re.IGNORECASE)
+    if any(
+        first_char.match(query, n - k)
+        and re.fullmatch(re.escape(query[:k]), query[n - k:], re.IGNORECASE)
+        for k in range(1, n)
+    ):
+        return re.compile(f"(?=({escaped}))", re.IGNORECASE)
+    return re.compile(f"({escaped})", re.IGNORECASE)
+
+
 @mcp.tool()
 def pdf_search(file_path: str, query: str, max_results: int = 10) -> str:
     """Search for text in the PDF and return matching snippets with context.
@@ -297,47 +332,51 @@ def pdf_search(file_path: str, query: str, max_results: int = 10) -> str:
         max_results: Maximum number of results to return (default 10).
     """
     try:
-        doc = open_doc(file_path)
+        entry = get_doc_entry(file_path)
     except (FileNotFoundError, ValueError) as e:
         return f"ERROR: {e}"
 
     if not query.strip():
         return "ERROR: Search query cannot be empty."
 
-    query_lower = query.lower()
+    pattern = _search_pattern(query)
     matches: list[str] = []
-    pages_with_hits: dict[int, int] = defaultdict(int)
-
-    for page_idx in range(len(doc)):
-        text = doc[page_idx].get_text()
-        text_lower = text.lower()
-        search_start = 0
-
-        while True:
-            pos = text_lower.find(query_lower, search_start)
-            if pos < 0:
-                break
+    # Page numbers are dense, so hit counts live in a flat per-page array.
+    hits = array("I", [0]) * len(entry["doc"])
+
+    # Page.search_for() is deliberately not used to prune pages: PyMuPDF
+    # turns every hit into a Quad in Python, which made frequent queries
+    # several times slower than get_text() plus this regex.
+    for page_idx, text in enumerate(iter_doc_texts(entry)):
+        if len(matches) >= max_results:
+            # Snippets are done; count the page's hits in one C-level pass.
+            hits[page_idx] = len(pattern.findall(text))
+            continue
 
-            pages_with_hits[page_idx + 1] += 1
+        for m in pattern.finditer(text):
+            hits[page_idx] += 1
 
             if len(matches) < max_results:
-                ctx_start = max(0, pos - 100)
-                ctx_end = min(len(text), pos + len(query) + 100)
+                ctx_start = max(0, m.start(1) - 100)
+                ctx_end = min(len(text), m.end(1) + 100)
                 snippet = text[ctx_start:ctx_end].replace("\n", " ").strip()
 
                 prefix = "..." if ctx_start > 0 else ""
                 suffix = "..." if ctx_end < len(text) else ""
                 matches.append(f"[Page {page_idx + 1}] {prefix}{snippet}{suffix}")
 
-            search_start = pos + 1
-
     if not matches:
         return f'No results found for "{query}".'
 
-    total_hits = sum(pages_with_hits.values())
-    page_summary = ", ".join(
-        f"p.{p}({c})" for p, c in sorted(pages_with_hits.items())
-    )
+    pages_with_hits = {i + 1: c for i, c in enumerate(hits) if c}
+    total_hits = sum(hits)
+    # Very common queries hit most pages; list only the first 50 of those.
+    if len(pages_with_hits) > 200:
+        page_summary = ", ".join(
+            f"p.{p}({c})" for p, c in islice(pages_with_hits.items(), 50)
+        ) + ", ..."
+    else:
+        page_summary = ", ".join(f"p.{p}({c})" for p, c in pages_with_hits.items())
 
     header = (
         f'[Search: "{query}" | {total_hits} hit(s) across '
@@ -375,6 +414,20 @@ def save_summary(pdf_file_path: str, markdown_content: str) -> str:
     out_dir.mkdir(parents=True, exist_ok=True)
 
     out_file = out_dir / f"{pdf_name}_summary.md"
-    out_file.write_text(markdown_content, encoding="utf-8")
+    data = markdown_content.encode("utf-8")
+    try:
+        unchanged = out_file.stat().st_size == len(data) and out_file.read_bytes() == data
+    except OSError:
+        unchanged = False
+    if not unchanged:
+        # Write beside the target and rename over it, so an interrupted
+        # save never leaves a truncated summary behind.
+        tmp_file = out_dir / f".{out_file.name}.{os.getpid()}.tmp"
+        try:
+            tmp_file.write_bytes(data)
+            os.replace(tmp_file, out_file)
+        except BaseException:
+            tmp_file.unlink(missing_ok=True)
+            raise
 
     return f"Summary saved to: {out_file}"